@@ -1,31 +1,114 @@
-from fastapi import FastAPI, HTTPException, Depends, Body, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, Body, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, HttpUrl
 from typing import List, Dict, Optional, Any, Union
 import uuid
+import base64
+import asyncio
 import datetime
-import json
 import os
 import shutil
-from sqlalchemy import create_engine, Column, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import create_engine, event, select, insert, Column, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.orm import sessionmaker, Session, relationship, raiseload
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
-from langchain_processor import KnowledgeBaseProcessor, ChatProcessor
-from document_processor import process_document, process_website
+from langchain_processor import KnowledgeBaseProcessor, get_chat_processor
+from document_processor import process_document, process_documents, process_website
+from llm_integration import aclose_all
+
+# Fast JSON (de)serialization for theme settings, falling back to stdlib json
+try:
+    import orjson
+
+    def _loads(s):
+        return orjson.loads(s)
+
+    def _dumps(o):
+        # orjson returns bytes; the theme column is Text
+        return orjson.dumps(o).decode()
+except ImportError:
+    import json
+
+    _loads = json.loads
+    _dumps = json.dumps
 
 # Database setup
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./botbuilder.db")
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+_is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    # Sessions are used from FastAPI's threadpool, not just the creating thread
+    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    pool_size=10,
+    max_overflow=20
+)
+
+# Async engine on the same database for the async endpoints
+ASYNC_DATABASE_URL = (
+    SQLALCHEMY_DATABASE_URL
+    .replace("sqlite://", "sqlite+aiosqlite://", 1)
+    .replace("postgresql://", "postgresql+asyncpg://", 1)
+)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    # aiosqlite connections aren't pooled, so only size the pool for server databases
+    **({} if _is_sqlite else {"pool_size": 10, "max_overflow": 20})
+)
+
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed alongside a writer; NORMAL is durable enough under WAL
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # SQLite only enforces foreign keys (and ON DELETE CASCADE) when asked to
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+if _is_sqlite:
+    event.listen(engine, "connect", _set_sqlite_pragma)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragma)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # Ensure directories exist
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("knowledge_bases", exist_ok=True)
 
+# Embeddable chat widget, served from disk
+EMBED_JS_PATH = "static/embed.js"
+
+# System prompt used when a bot doesn't define its own
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant that answers questions based on the provided knowledge base."
+
+# File types accepted for knowledge base uploads
+ALLOWED_EXTENSIONS = frozenset({".pdf", ".docx", ".txt", ".csv"})
+ALLOWED_EXTENSIONS_STR = ", ".join(sorted(ALLOWED_EXTENSIONS))
+
+# Upload files are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Column types
+class JSONEncodedDict(TypeDecorator):
+    """
+    Stores a dict as JSON text, converting once at the ORM boundary
+    """
+    impl = Text
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return None if value is None else _dumps(value)
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else _loads(value)
+
 # Models
 class Bot(Base):
     __tablename__ = "bots"
@@ -36,16 +119,16 @@ class Bot(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     system_prompt = Column(Text, nullable=True)
-    theme = Column(Text, nullable=True)  # JSON string of theme settings
+    theme = Column(JSONEncodedDict, nullable=True)  # Theme settings, stored as JSON
     
-    knowledge_sources = relationship("KnowledgeSource", back_populates="bot")
-    messages = relationship("Message", back_populates="bot")
+    knowledge_sources = relationship("KnowledgeSource", back_populates="bot", cascade="all, delete-orphan", passive_deletes=True)
+    messages = relationship("Message", back_populates="bot", cascade="all, delete-orphan", passive_deletes=True)
 
 class KnowledgeSource(Base):
     __tablename__ = "knowledge_sources"
     
     id = Column(String, primary_key=True, index=True)
-    bot_id = Column(String, ForeignKey("bots.id"))
+    bot_id = Column(String, ForeignKey("bots.id", ondelete="CASCADE"), index=True)
     name = Column(String)
     source_type = Column(String)  # 'file' or 'website'
     url = Column(String, nullable=True)
@@ -60,7 +143,7 @@ class Message(Base):
     __tablename__ = "messages"
     
     id = Column(String, primary_key=True, index=True)
-    bot_id = Column(String, ForeignKey("bots.id"))
+    bot_id = Column(String, ForeignKey("bots.id", ondelete="CASCADE"), index=True)
     content = Column(Text)
     sender = Column(String)  # 'user' or 'bot'
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -78,6 +161,28 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _new_id() -> str:
+    """
+    Generate a primary key: a UUID4 as 22 chars of URL-safe base64 instead of 36 hex chars
+    """
+    return base64.urlsafe_b64encode(uuid.uuid4().bytes).rstrip(b"=").decode()
+
+def _bot_exists(db: Session, bot_id: str) -> bool:
+    """
+    Check that a bot exists without loading the full row
+    """
+    return db.query(Bot.id).filter(Bot.id == bot_id).first() is not None
+
+async def _bot_exists_async(db: AsyncSession, bot_id: str) -> bool:
+    """
+    Async variant of _bot_exists
+    """
+    return await db.scalar(select(Bot.id).where(Bot.id == bot_id)) is not None
+
 # Pydantic models
 class BotCreate(BaseModel):
     name: str
@@ -138,21 +243,45 @@ class ChatResponse(BaseModel):
     timestamp: datetime.datetime
 
 # FastAPI app
-app = FastAPI(title="PyBotBuilder API")
+app = FastAPI(title="PyBotBuilder API", default_response_class=ORJSONResponse)
 
-# CORS middleware
+# CORS middleware, restricted to a comma-separated allowlist
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=600,
 )
 
+# Compress larger responses (embed.js, bot and knowledge source lists)
+class _GZipExceptStreamsMiddleware(GZipMiddleware):
+    """
+    GZip middleware that leaves event streams alone, since the compressor
+    would buffer each event instead of sending it immediately
+    """
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(_GZipExceptStreamsMiddleware, minimum_size=500)
+
+# Static assets (embed.js)
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
+# Close pooled async HTTP sessions held by LLM integrations
+@app.on_event("shutdown")
+async def close_llm_sessions():
+    await aclose_all()
+
 # Bot endpoints
 @app.post("/api/bots", response_model=BotResponse)
 def create_bot(bot: BotCreate, db: Session = Depends(get_db)):
-    bot_id = str(uuid.uuid4())
+    bot_id = _new_id()
     
     # Create bot directory for knowledge base
     os.makedirs(f"knowledge_bases/{bot_id}", exist_ok=True)
@@ -161,7 +290,7 @@ def create_bot(bot: BotCreate, db: Session = Depends(get_db)):
         id=bot_id,
         name=bot.name,
         description=bot.description,
-        system_prompt=bot.system_prompt or "You are a helpful assistant that answers questions based on the provided knowledge base."
+        system_prompt=bot.system_prompt or DEFAULT_SYSTEM_PROMPT
     )
     db.add(db_bot)
     db.commit()
@@ -174,39 +303,27 @@ def create_bot(bot: BotCreate, db: Session = Depends(get_db)):
 
 @app.get("/api/bots", response_model=List[BotResponse])
 def get_bots(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    bots = db.query(Bot).offset(skip).limit(limit).all()
-    
-    # Parse theme JSON for each bot
-    for bot in bots:
-        if bot.theme:
-            bot.theme = json.loads(bot.theme)
+    # Relationships aren't part of BotResponse; fail loudly instead of lazy loading per bot
+    bots = db.query(Bot).options(raiseload("*")).offset(skip).limit(limit).all()
     
     return bots
 
 @app.get("/api/bots/{bot_id}", response_model=BotResponse)
 def get_bot(bot_id: str, db: Session = Depends(get_db)):
-    db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    db_bot = db.get(Bot, bot_id)
     if db_bot is None:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    # Parse theme JSON
-    if db_bot.theme:
-        db_bot.theme = json.loads(db_bot.theme)
-    
     return db_bot
 
 @app.put("/api/bots/{bot_id}", response_model=BotResponse)
 def update_bot(bot_id: str, bot: BotUpdate, db: Session = Depends(get_db)):
-    db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    db_bot = db.get(Bot, bot_id)
     if db_bot is None:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     update_data = bot.dict(exclude_unset=True)
     
-    # Convert theme to JSON string if provided
-    if "theme" in update_data:
-        update_data["theme"] = json.dumps(update_data["theme"])
-    
     for key, value in update_data.items():
         setattr(db_bot, key, value)
     
@@ -214,62 +331,128 @@ def update_bot(bot_id: str, bot: BotUpdate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(db_bot)
     
-    # Parse theme JSON for response
-    if db_bot.theme:
-        db_bot.theme = json.loads(db_bot.theme)
-    
     return db_bot
 
 @app.delete("/api/bots/{bot_id}")
 def delete_bot(bot_id: str, db: Session = Depends(get_db)):
-    db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
-    if db_bot is None:
-        raise HTTPException(status_code=404, detail="Bot not found")
-    
-    # Delete knowledge sources
-    db.query(KnowledgeSource).filter(KnowledgeSource.bot_id == bot_id).delete()
-    
-    # Delete messages
-    db.query(Message).filter(Message.bot_id == bot_id).delete()
+    # Delete child rows explicitly (cheap via the bot_id indexes). Databases created
+    # before the FKs gained ON DELETE CASCADE would otherwise reject the bot delete.
+    db.query(KnowledgeSource).filter(KnowledgeSource.bot_id == bot_id).delete(synchronize_session=False)
+    db.query(Message).filter(Message.bot_id == bot_id).delete(synchronize_session=False)
     
     # Delete bot
-    db.delete(db_bot)
+    deleted = db.query(Bot).filter(Bot.id == bot_id).delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Bot not found")
     db.commit()
     
-    # Delete knowledge base directory
-    kb_dir = f"knowledge_bases/{bot_id}"
-    if os.path.exists(kb_dir):
-        shutil.rmtree(kb_dir)
+    # Delete knowledge base
+    KnowledgeBaseProcessor.delete_for_bot(bot_id)
     
     return {"detail": "Bot deleted successfully"}
 
+# Background processing
+def _save_upload(src, file_path: str):
+    """
+    Copy an uploaded file to disk in bounded chunks
+    """
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(src, buffer, UPLOAD_CHUNK_SIZE)
+
+def _discard_orphaned_source(db: Session, bot_id: str, source_id: str):
+    """
+    Drop chunks indexed for a source (or bot) deleted while it was being processed
+    """
+    if db.get(Bot, bot_id) is None:
+        KnowledgeBaseProcessor.delete_for_bot(bot_id)
+    else:
+        KnowledgeBaseProcessor.remove_source(bot_id, source_id)
+
+def _mark_source(db: Session, bot_id: str, source_id: str, error: Optional[Exception]):
+    """
+    Record a processing outcome, unless the source was deleted in the meantime
+    """
+    # Re-read the row: it may have been deleted while the source was processed
+    db.expunge_all()
+    db_source = db.get(KnowledgeSource, source_id)
+    if db_source is None:
+        _discard_orphaned_source(db, bot_id, source_id)
+        return
+    
+    if error is None:
+        # Update status to ready
+        db_source.status = "ready"
+        db_source.updated_at = datetime.datetime.utcnow()
+    else:
+        db_source.status = "error"
+        print(f"Error processing {db_source.source_type} source: {error}")
+    
+    try:
+        db.commit()
+    except StaleDataError:
+        # Deleted between the read and the update
+        db.rollback()
+        _discard_orphaned_source(db, bot_id, source_id)
+
+def _process_and_mark(source_id: str, processor, target: str, bot_id: str):
+    """
+    Run a document/website processor and record the outcome on the knowledge source.
+    Uses its own session rather than sharing the request session.
+    """
+    db = SessionLocal()
+    try:
+        if db.get(KnowledgeSource, source_id) is None:
+            return
+        db.rollback()
+        
+        error = None
+        try:
+            # Process the source and add to knowledge base
+            processor(target, bot_id, source_id)
+        except Exception as e:
+            error = e
+        
+        _mark_source(db, bot_id, source_id, error)
+    finally:
+        db.close()
+
+def _process_batch_and_mark(bot_id: str, uploads: List[tuple]):
+    """
+    Process uploaded documents in parallel and record each outcome.
+    `uploads` is a list of (file_path, source_id) pairs.
+    """
+    db = SessionLocal()
+    try:
+        for source_id, error in process_documents(uploads, bot_id):
+            _mark_source(db, bot_id, source_id, error)
+    finally:
+        db.close()
+
 # Knowledge base endpoints
 @app.post("/api/bots/{bot_id}/knowledge/files", response_model=KnowledgeSourceResponse)
 async def upload_file(
     bot_id: str,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
-    if db_bot is None:
+    if not await _bot_exists_async(db, bot_id):
         raise HTTPException(status_code=404, detail="Bot not found")
     
     # Check file extension
-    allowed_extensions = ['.pdf', '.docx', '.txt', '.csv']
     file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
-        raise HTTPException(status_code=400, detail=f"Unsupported file type. Allowed types: {', '.join(allowed_extensions)}")
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type. Allowed types: {ALLOWED_EXTENSIONS_STR}")
     
     # Create unique filename
     unique_filename = f"{uuid.uuid4()}{file_ext}"
     file_path = f"uploads/{unique_filename}"
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Save file off the event loop
+    await asyncio.to_thread(_save_upload, file.file, file_path)
     
     # Create knowledge source
-    source_id = str(uuid.uuid4())
+    source_id = _new_id()
     db_source = KnowledgeSource(
         id=source_id,
         bot_id=bot_id,
@@ -279,41 +462,69 @@ async def upload_file(
         status="processing"
     )
     db.add(db_source)
-    db.commit()
-    db.refresh(db_source)
+    await db.commit()
+    await db.refresh(db_source)
     
-    # Process document in background (in a real app, this would be a background task)
-    try:
-        # Process the document and add to knowledge base
-        process_document(file_path, bot_id, source_id)
-        
-        # Update status to ready
-        db_source.status = "ready"
-        db_source.updated_at = datetime.datetime.utcnow()
-        db.commit()
-        db.refresh(db_source)
-    except Exception as e:
-        db_source.status = "error"
-        db.commit()
-        print(f"Error processing document: {e}")
+    # Process document in the background so the event loop stays free
+    background_tasks.add_task(_process_and_mark, source_id, process_document, file_path, bot_id)
     
     return db_source
 
+@app.post("/api/bots/{bot_id}/knowledge/files:batch", response_model=List[KnowledgeSourceResponse])
+async def upload_files(
+    bot_id: str,
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not await _bot_exists_async(db, bot_id):
+        raise HTTPException(status_code=404, detail="Bot not found")
+    
+    # Check all file extensions before saving anything
+    file_exts = [os.path.splitext(file.filename)[1].lower() for file in files]
+    for file_ext in file_exts:
+        if file_ext not in ALLOWED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail=f"Unsupported file type. Allowed types: {ALLOWED_EXTENSIONS_STR}")
+    
+    # Save files one at a time; parsing, not disk I/O, is what benefits from parallelism
+    db_sources = []
+    for file, file_ext in zip(files, file_exts):
+        file_path = f"uploads/{uuid.uuid4()}{file_ext}"
+        await asyncio.to_thread(_save_upload, file.file, file_path)
+        
+        db_sources.append(KnowledgeSource(
+            id=_new_id(),
+            bot_id=bot_id,
+            name=file.filename,
+            source_type="file",
+            file_path=file_path,
+            status="processing"
+        ))
+    
+    db.add_all(db_sources)
+    await db.commit()
+    
+    # Process documents in the background across the worker pool
+    uploads = [(db_source.file_path, db_source.id) for db_source in db_sources]
+    background_tasks.add_task(_process_batch_and_mark, bot_id, uploads)
+    
+    return db_sources
+
 @app.post("/api/bots/{bot_id}/knowledge/websites", response_model=KnowledgeSourceResponse)
 async def add_website(
     bot_id: str,
     source: KnowledgeSourceCreate,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
-    if db_bot is None:
+    if not await _bot_exists_async(db, bot_id):
         raise HTTPException(status_code=404, detail="Bot not found")
     
     if source.source_type != "website" or not source.url:
         raise HTTPException(status_code=400, detail="Invalid source type or missing URL")
     
     # Create knowledge source
-    source_id = str(uuid.uuid4())
+    source_id = _new_id()
     db_source = KnowledgeSource(
         id=source_id,
         bot_id=bot_id,
@@ -323,43 +534,27 @@ async def add_website(
         status="processing"
     )
     db.add(db_source)
-    db.commit()
-    db.refresh(db_source)
+    await db.commit()
+    await db.refresh(db_source)
     
-    # Process website in background (in a real app, this would be a background task)
-    try:
-        # Process the website and add to knowledge base
-        process_website(source.url, bot_id, source_id)
-        
-        # Update status to ready
-        db_source.status = "ready"
-        db_source.updated_at = datetime.datetime.utcnow()
-        db.commit()
-        db.refresh(db_source)
-    except Exception as e:
-        db_source.status = "error"
-        db.commit()
-        print(f"Error processing website: {e}")
+    # Process website in the background so the event loop stays free
+    background_tasks.add_task(_process_and_mark, source_id, process_website, source.url, bot_id)
     
     return db_source
 
 @app.get("/api/bots/{bot_id}/knowledge", response_model=List[KnowledgeSourceResponse])
 def get_knowledge_sources(bot_id: str, db: Session = Depends(get_db)):
-    db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
-    if db_bot is None:
+    if not _bot_exists(db, bot_id):
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    sources = db.query(KnowledgeSource).filter(KnowledgeSource.bot_id == bot_id).all()
+    sources = db.query(KnowledgeSource).options(raiseload("*")).filter(KnowledgeSource.bot_id == bot_id).all()
     return sources
 
 @app.delete("/api/bots/{bot_id}/knowledge/{source_id}")
 def delete_knowledge_source(bot_id: str, source_id: str, db: Session = Depends(get_db)):
-    db_source = db.query(KnowledgeSource).filter(
-        KnowledgeSource.id == source_id,
-        KnowledgeSource.bot_id == bot_id
-    ).first()
+    db_source = db.get(KnowledgeSource, source_id)
     
-    if db_source is None:
+    if db_source is None or db_source.bot_id != bot_id:
         raise HTTPException(status_code=404, detail="Knowledge source not found")
     
     # Delete file if it exists
@@ -375,47 +570,50 @@ def delete_knowledge_source(bot_id: str, source_id: str, db: Session = Depends(g
     
     return {"detail": "Knowledge source deleted successfully"}
 
-# Chat endpoint
+# Chat endpoints
+async def _save_message(db: AsyncSession, bot_id: str, content: str, sender: str):
+    """
+    Save and commit a chat message. Messages are append-only, so they're written
+    with a Core insert rather than through the ORM.
+    """
+    await db.execute(insert(Message), [{
+        "id": _new_id(),
+        "bot_id": bot_id,
+        "content": content,
+        "sender": sender,
+        "created_at": datetime.datetime.utcnow()
+    }])
+    await db.commit()
+
 @app.post("/api/chat/{bot_id}", response_model=ChatResponse)
 async def chat_with_bot(
     bot_id: str, 
     chat_request: ChatRequest = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    db_bot = await db.get(Bot, bot_id)
     if db_bot is None:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     # Get system prompt
-    system_prompt = db_bot.system_prompt or "You are a helpful assistant that answers questions based on the provided knowledge base."
+    system_prompt = db_bot.system_prompt or DEFAULT_SYSTEM_PROMPT
     
-    # Save user message
-    user_message = Message(
-        id=str(uuid.uuid4()),
-        bot_id=bot_id,
-        content=chat_request.message,
-        sender="user"
-    )
-    db.add(user_message)
-    db.commit()
+    # Save user message. Committed before the LLM call so history is durable
+    # and no transaction is held open while waiting on the model.
+    await _save_message(db, bot_id, chat_request.message, "user")
     
-    # Process the chat request using LangChain
-    chat_processor = ChatProcessor(bot_id)
-    response_text, sources = chat_processor.process_message(
+    # Process the chat request using LangChain. Retrieval and the LLM call block,
+    # so run them in a worker thread to keep the event loop free.
+    chat_processor = get_chat_processor(bot_id)
+    response_text, sources = await asyncio.to_thread(
+        chat_processor.process_message,
         chat_request.message,
         chat_request.conversation_history,
         system_prompt
     )
     
     # Save bot response
-    bot_message = Message(
-        id=str(uuid.uuid4()),
-        bot_id=bot_id,
-        content=response_text,
-        sender="bot"
-    )
-    db.add(bot_message)
-    db.commit()
+    await _save_message(db, bot_id, response_text, "bot")
     
     return {
         "response": response_text,
@@ -423,309 +621,56 @@ async def chat_with_bot(
         "timestamp": datetime.datetime.utcnow()
     }
 
-# Embed code endpoints
-@app.get("/api/chatbot/{bot_id}/embed.js")
-async def get_embed_js(bot_id: str, db: Session = Depends(get_db)):
-    db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
+@app.post("/api/chat/{bot_id}/stream")
+async def stream_chat_with_bot(
+    bot_id: str,
+    chat_request: ChatRequest = Body(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_bot = await db.get(Bot, bot_id)
     if db_bot is None:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    # In a real implementation, this would serve the actual JavaScript file
-    # For this example, we'll return a simple script
-    js_content = """
-    (function() {
-        window.PyBotBuilder = {
-            init: function(config) {
-                const botId = config.botId;
-                const mode = config.mode || 'inline';
-                const theme = config.theme || {};
-                const botName = config.botName || 'AI Assistant';
-                
-                if (mode === 'inline') {
-                    const container = document.getElementById(config.containerId);
-                    if (!container) {
-                        console.error('PyBotBuilder: Container element not found');
-                        return;
-                    }
-                    
-                    this.createChatInterface(container, botId, theme, botName);
-                } else if (mode === 'popup') {
-                    this.createPopupWidget(botId, theme, botName);
-                }
-            },
-            
-            createChatInterface: function(container, botId, theme, botName) {
-                // Create chat interface HTML
-                container.innerHTML = `
-                    <div class="pybot-chat" style="
-                        font-family: ${theme.fontFamily || 'sans-serif'};
-                        border-radius: ${theme.borderRadius || '8px'};
-                        overflow: hidden;
-                        border: 1px solid #e2e8f0;
-                        height: 500px;
-                        display: flex;
-                        flex-direction: column;
-                    ">
-                        <div class="pybot-header" style="
-                            background-color: ${theme.headerColor || '#f8fafc'};
-                            color: ${theme.textColor || '#000000'};
-                            padding: 12px;
-                            border-bottom: 1px solid #e2e8f0;
-                            display: flex;
-                            align-items: center;
-                        ">
-                            <div class="pybot-avatar" style="
-                                width: 32px;
-                                height: 32px;
-                                border-radius: 50%;
-                                background-color: #cbd5e1;
-                                margin-right: 8px;
-                            "></div>
-                            <div>
-                                <div style="font-weight: 500;">${botName}</div>
-                                <div style="font-size: 12px; opacity: 0.7;">Online</div>
-                            </div>
-                        </div>
-                        <div class="pybot-messages" style="
-                            flex: 1;
-                            overflow-y: auto;
-                            padding: 16px;
-                            background-color: ${theme.backgroundColor || '#ffffff'};
-                            color: ${theme.textColor || '#000000'};
-                        ">
-                            <div class="pybot-message bot" style="
-                                display: flex;
-                                margin-bottom: 16px;
-                            ">
-                                <div style="
-                                    background-color: #f1f5f9;
-                                    padding: 12px;
-                                    border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
-                                    max-width: 80%;
-                                ">
-                                    <div style="font-size: 14px;">Hello! How can I help you today?</div>
-                                    <div style="font-size: 12px; opacity: 0.7; margin-top: 4px;">${new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })}</div>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="pybot-input" style="
-                            padding: 12px;
-                            border-top: 1px solid #e2e8f0;
-                            background-color: ${theme.backgroundColor || '#ffffff'};
-                        ">
-                            <form class="pybot-form" style="
-                                display: flex;
-                                gap: 8px;
-                            ">
-                                <input type="text" class="pybot-input-field" placeholder="Type a message..." style="
-                                    flex: 1;
-                                    padding: 8px 12px;
-                                    border: 1px solid #e2e8f0;
-                                    border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
-                                    font-size: 14px;
-                                ">
-                                <button type="submit" class="pybot-send-button" style="
-                                    background-color: ${theme.primaryColor || '#0ea5e9'};
-                                    color: white;
-                                    border: none;
-                                    border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
-                                    width: 36px;
-                                    height: 36px;
-                                    display: flex;
-                                    align-items: center;
-                                    justify-content: center;
-                                    cursor: pointer;
-                                ">
-                                    <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                        <line x1="22" y1="2" x2="11" y2="13"></line>
-                                        <polygon points="22 2 15 22 11 13 2 9 22 2"></polygon>
-                                    </svg>
-                                </button>
-                            </form>
-                        </div>
-                    </div>
-                `;
-                
-                // Add event listeners
-                const form = container.querySelector('.pybot-form');
-                const input = container.querySelector('.pybot-input-field');
-                const messagesContainer = container.querySelector('.pybot-messages');
-                
-                form.addEventListener('submit', function(e) {
-                    e.preventDefault();
-                    const message = input.value.trim();
-                    if (!message) return;
-                    
-                    // Add user message
-                    this.addMessage(messagesContainer, message, 'user', theme);
-                    input.value = '';
-                    
-                    // Simulate bot response
-                    this.simulateBotResponse(messagesContainer, message, botId, theme);
-                }.bind(this));
-            },
-            
-            createPopupWidget: function(botId, theme, botName) {
-                // Create button element
-                const button = document.createElement('div');
-                button.className = 'pybot-widget-button';
-                button.style.cssText = `
-                    position: fixed;
-                    bottom: 20px;
-                    right: 20px;
-                    width: 56px;
-                    height: 56px;
-                    border-radius: 50%;
-                    background-color: ${theme.primaryColor || '#0ea5e9'};
-                    color: white;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    cursor: pointer;
-                    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
-                    z-index: 9999;
-                `;
-                
-                button.innerHTML = `
-                    <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                        <path d="M21 15a2 2 0 0 1-2 2H7l-4 4V5a2 2 0 0 1 2-2h14a2 2 0 0 1 2 2z"></path>
-                    </svg>
-                `;
-                
-                // Create chat container
-                const chatContainer = document.createElement('div');
-                chatContainer.className = 'pybot-popup-container';
-                chatContainer.style.cssText = `
-                    position: fixed;
-                    bottom: 90px;
-                    right: 20px;
-                    width: 350px;
-                    height: 500px;
-                    border-radius: ${theme.borderRadius || '8px'};
-                    overflow: hidden;
-                    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
-                    z-index: 9999;
-                    display: none;
-                `;
-                
-                document.body.appendChild(button);
-                document.body.appendChild(chatContainer);
-                
-                // Toggle chat on button click
-                button.addEventListener('click', function() {
-                    if (chatContainer.style.display === 'none') {
-                        chatContainer.style.display = 'block';
-                        if (!chatContainer.hasChildNodes()) {
-                            this.createChatInterface(chatContainer, botId, theme, botName);
-                        }
-                    } else {
-                        chatContainer.style.display = 'none';
-                    }
-                }.bind(this));
-            },
-            
-            addMessage: function(container, text, sender, theme) {
-                const messageDiv = document.createElement('div');
-                messageDiv.className = `pybot-message ${sender}`;
-                messageDiv.style.cssText = `
-                    display: flex;
-                    margin-bottom: 16px;
-                    ${sender === 'user' ? 'justify-content: flex-end;' : ''}
-                `;
-                
-                const messageContent = document.createElement('div');
-                messageContent.style.cssText = `
-                    ${sender === 'user' 
-                        ? `background-color: ${theme.primaryColor || '#0ea5e9'}; color: white;` 
-                        : 'background-color: #f1f5f9; color: #1e293b;'}
-                    padding: 12px;
-                    border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
-                    max-width: 80%;
-                `;
-                
-                const messageText = document.createElement('div');
-                messageText.style.cssText = 'font-size: 14px;';
-                messageText.textContent = text;
-                
-                const messageTime = document.createElement('div');
-                messageTime.style.cssText = 'font-size: 12px; opacity: 0.7; margin-top: 4px;';
-                messageTime.textContent = new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
-                
-                messageContent.appendChild(messageText);
-                messageContent.appendChild(messageTime);
-                messageDiv.appendChild(messageContent);
-                container.appendChild(messageDiv);
-                
-                // Scroll to bottom
-                container.scrollTop = container.scrollHeight;
-            },
-            
-            simulateBotResponse: function(container, message, botId, theme) {
-                // Add typing indicator
-                const typingDiv = document.createElement('div');
-                typingDiv.className = 'pybot-message bot typing';
-                typingDiv.style.cssText = 'display: flex; margin-bottom: 16px;';
-                
-                const typingContent = document.createElement('div');
-                typingContent.style.cssText = `
-                    background-color: #f1f5f9;
-                    padding: 12px;
-                    border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
-                    max-width: 80%;
-                    display: flex;
-                    align-items: center;
-                `;
-                
-                typingContent.innerHTML = `
-                    <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" class="pybot-typing-icon" style="margin-right: 8px; animation: pybot-spin 1s linear infinite;">
-                        <path d="M21 12a9 9 0 1 1-6.219-8.56"></path>
-                    </svg>
-                    <span style="font-size: 14px; color: #64748b;">Thinking...</span>
-                `;
-                
-                typingDiv.appendChild(typingContent);
-                container.appendChild(typingDiv);
-                
-                // Scroll to bottom
-                container.scrollTop = container.scrollHeight;
-                
-                // In a real implementation, this would call your API
-                setTimeout(() => {
-                    // Remove typing indicator
-                    container.removeChild(typingDiv);
-                    
-                    // Add bot response
-                    let response = "I understand you're asking about that. In a real implementation, I would use the knowledge base to provide a relevant answer.";
-                    
-                    // Simple response logic based on keywords
-                    if (message.toLowerCase().includes('hello') || message.toLowerCase().includes('hi')) {
-                        response = "Hello! How can I assist you today?";
-                    } else if (message.toLowerCase().includes('help')) {
-                        response = "I'm here to help! You can ask me questions about our products, services, or anything else you need assistance with.";
-                    } else if (message.toLowerCase().includes('thank')) {
-                        response = "You're welcome! Is there anything else I can help you with?";
-                    } else if (message.toLowerCase().includes('bye')) {
-                        response = "Goodbye! Have a great day!";
-                    }
-                    
-                    this.addMessage(container, response, 'bot', theme);
-                }, 1500);
-            }
-        };
+    # Get system prompt
+    system_prompt = db_bot.system_prompt or DEFAULT_SYSTEM_PROMPT
+    
+    # Save user message
+    await _save_message(db, bot_id, chat_request.message, "user")
+    
+    chat_processor = get_chat_processor(bot_id)
+    
+    async def event_stream():
+        # Send the answer as server-sent events while it is generated
+        chunks = []
+        async for chunk in chat_processor.astream_message(
+            chat_request.message,
+            chat_request.conversation_history,
+            system_prompt
+        ):
+            chunks.append(chunk)
+            yield f"data: {_dumps({'token': chunk})}\n\n"
         
-        // Add styles
-        const style = document.createElement('style');
-        style.textContent = `
-            @keyframes pybot-spin {
-                from { transform: rotate(0deg); }
-                to { transform: rotate(360deg); }
-            }
-        `;
-        document.head.appendChild(style);
-    })();
-    """
+        # Save bot response once the stream is complete. If the client disconnects
+        # first, the generator is closed at the yield above, the LLM call is
+        # cancelled and the partial answer is not saved.
+        async with AsyncSessionLocal() as session:
+            await _save_message(session, bot_id, "".join(chunks), "bot")
+        
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+# Embed code endpoints
+@app.get("/api/chatbot/{bot_id}/embed.js")
+async def get_embed_js(bot_id: str, db: AsyncSession = Depends(get_async_db)):
+    if not await _bot_exists_async(db, bot_id):
+        raise HTTPException(status_code=404, detail="Bot not found")
     
-    return HTMLResponse(content=js_content, media_type="application/javascript")
+    return FileResponse(
+        EMBED_JS_PATH,
+        media_type="application/javascript",
+        headers={"Cache-Control": "public, max-age=86400"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,49 @@
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+def cache_key(*parts: str) -> str:
+    """
+    BLAKE2b digest of the normalized parts, so trivially different inputs
+    (case, Unicode form, extra whitespace) share a cache entry
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        normalized = " ".join(unicodedata.normalize("NFC", part).casefold().split())
+        digest.update(normalized.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with a fixed number of entries
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+    
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def pop(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
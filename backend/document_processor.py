@@ -1,18 +1,50 @@
 import os
-from typing import List
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+from functools import lru_cache
+from typing import List, Set, Any, Tuple, Iterator, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import aiohttp
+from selectolax.parser import HTMLParser
 from urllib.parse import urljoin, urlparse
 from langchain.document_loaders import (
-    PyPDFLoader,
+    PyMuPDFLoader,
     Docx2txtLoader,
     TextLoader,
     CSVLoader,
     UnstructuredURLLoader
 )
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
 from langchain_processor import KnowledgeBaseProcessor
 
+# Maximum number of pages fetched concurrently while crawling
+CRAWL_CONCURRENCY = 20
+
+# Links that are never followed while crawling (anchors, non-HTTP schemes)
+_SKIP_LINK_PREFIXES = ('#', 'mailto:', 'tel:', 'javascript:')
+
+@lru_cache(maxsize=None)
+def _get_text_splitter() -> RecursiveCharacterTextSplitter:
+    """
+    Shared splitter, sized in embedding-model tokens rather than characters.
+    Built on first use, since loading the tokenizer may download its encoding.
+    """
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name="cl100k_base",
+        chunk_size=500,
+        chunk_overlap=75
+    )
+
+# Document parsing is CPU-bound, so documents are loaded and split on a shared
+# pool of worker processes
+LOAD_DOC_WORKERS = int(os.getenv("LOAD_DOC_WORKERS", max(1, (os.cpu_count() or 1) - 1)))
+_doc_executor = ProcessPoolExecutor(max_workers=LOAD_DOC_WORKERS)
+
+# A single PDF with at least this many pages is split into this many page
+# ranges, each loaded and split as a separate task on the shared pool
+PDF_PARALLEL_MIN_PAGES = 64
+PDF_LOAD_WORKERS = min(LOAD_DOC_WORKERS, 4)
+
 def process_document(file_path: str, bot_id: str, source_id: str):
     """
     Process a document and add it to the bot's knowledge base
@@ -22,13 +54,74 @@ def process_document(file_path: str, bot_id: str, source_id: str):
         bot_id: ID of the bot
         source_id: ID of the knowledge source
     """
+    split_documents = _load_and_split_in_pool(file_path)
+    
+    # Add to knowledge base
+    KnowledgeBaseProcessor.add_documents(bot_id, source_id, split_documents)
+
+def process_documents(uploads: List[Tuple[str, str]], bot_id: str) -> Iterator[Tuple[str, Optional[Exception]]]:
+    """
+    Process several documents in parallel and add them to the bot's knowledge base
+    
+    Loading and splitting run in the worker pool; each document is added to the
+    knowledge base from the calling process as soon as it is ready, so every
+    write goes through the same vector store handle.
+    
+    Args:
+        uploads: (file_path, source_id) pairs, one knowledge source per document
+        bot_id: ID of the bot
+        
+    Yields:
+        (source_id, error) as each document finishes; error is None on success
+    """
+    futures = {
+        _doc_executor.submit(_load_and_split, file_path): source_id
+        for file_path, source_id in uploads
+    }
+    
+    for future in as_completed(futures):
+        source_id = futures[future]
+        try:
+            KnowledgeBaseProcessor.add_documents(bot_id, source_id, future.result())
+        except Exception as e:
+            yield source_id, e
+        else:
+            yield source_id, None
+
+def _load_and_split_in_pool(file_path: str) -> List[Any]:
+    """
+    Load and split a single document on the shared worker pool
+    
+    Large PDFs are split into contiguous page ranges that are processed as
+    separate tasks and reassembled in order.
+    """
+    ranges = _pdf_page_ranges(file_path) if file_path.lower().endswith('.pdf') else []
+    if len(ranges) < 2:
+        return _doc_executor.submit(_load_and_split, file_path).result()
+    
+    futures = [
+        _doc_executor.submit(_load_and_split_pdf_pages, file_path, start, stop)
+        for start, stop in ranges
+    ]
+    return [doc for future in futures for doc in future.result()]
+
+def _load_and_split(file_path: str) -> List[Any]:
+    """
+    Load a document and split it into chunks
+    
+    Args:
+        file_path: Path to the document
+        
+    Returns:
+        List of split documents
+    """
     # Check file extension
     _, ext = os.path.splitext(file_path)
     ext = ext.lower()
     
     # Load document based on file type
     if ext == '.pdf':
-        loader = PyPDFLoader(file_path)
+        loader = PyMuPDFLoader(file_path)
     elif ext == '.docx':
         loader = Docx2txtLoader(file_path)
     elif ext == '.txt':
@@ -38,22 +131,50 @@ def process_document(file_path: str, bot_id: str, source_id: str):
     else:
         raise ValueError(f"Unsupported file type: {ext}")
     
-    # Load documents
-    documents = loader.load()
-    
+    return _split(file_path, loader.load())
+
+def _split(file_path: str, documents: List[Any]) -> List[Any]:
+    """
+    Tag documents loaded from a file with its name and split them into chunks
+    """
     # Add source metadata
     for doc in documents:
         doc.metadata["source"] = os.path.basename(file_path)
     
     # Split documents
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    split_documents = text_splitter.split_documents(documents)
+    return _get_text_splitter().split_documents(documents)
+
+def _pdf_page_ranges(file_path: str) -> List[Tuple[int, int]]:
+    """
+    Contiguous page ranges to load a PDF in parallel, or none if it is too small
+    """
+    import fitz
     
-    # Add to knowledge base
-    KnowledgeBaseProcessor.add_documents(bot_id, source_id, split_documents)
+    with fitz.open(file_path) as pdf:
+        page_count = pdf.page_count
+    
+    if page_count < PDF_PARALLEL_MIN_PAGES or PDF_LOAD_WORKERS < 2:
+        return []
+    
+    step = -(-page_count // PDF_LOAD_WORKERS)
+    return [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+def _load_and_split_pdf_pages(file_path: str, start: int, stop: int) -> List[Any]:
+    """
+    Extract the text of pages [start, stop) of a PDF and split it into chunks
+    """
+    import fitz
+    
+    with fitz.open(file_path) as pdf:
+        documents = [
+            Document(
+                page_content=pdf.load_page(i).get_text(),
+                metadata={"file_path": file_path, "page": i, "total_pages": pdf.page_count}
+            )
+            for i in range(start, stop)
+        ]
+    
+    return _split(file_path, documents)
 
 def process_website(url: str, bot_id: str, source_id: str, max_depth: int = 1):
     """
@@ -85,16 +206,12 @@ def process_website(url: str, bot_id: str, source_id: str, max_depth: int = 1):
         doc.metadata["source"] = url
     
     # Split documents
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    split_documents = text_splitter.split_documents(documents)
+    split_documents = _get_text_splitter().split_documents(documents)
     
     # Add to knowledge base
     KnowledgeBaseProcessor.add_documents(bot_id, source_id, split_documents)
 
-def crawl_website(url: str, base_url: str, max_depth: int = 1, current_depth: int = 0, visited: List[str] = None) -> List[str]:
+def crawl_website(url: str, base_url: str, max_depth: int = 1) -> List[str]:
     """
     Crawl a website and return a list of URLs
     
@@ -102,50 +219,87 @@ def crawl_website(url: str, base_url: str, max_depth: int = 1, current_depth: in
         url: URL to crawl
         base_url: Base URL for relative links
         max_depth: Maximum depth to crawl
-        current_depth: Current depth
-        visited: List of visited URLs
         
     Returns:
         List of URLs
     """
-    if visited is None:
-        visited = []
+    return asyncio.run(_crawl_website(url, base_url, max_depth))
+
+async def _crawl_website(url: str, base_url: str, max_depth: int) -> List[str]:
+    """
+    Breadth-first crawl, fetching each depth level concurrently
+    """
+    base_netloc = urlparse(base_url).netloc
+    visited = {url}
+    urls = []
+    frontier = [url]
+    semaphore = asyncio.Semaphore(CRAWL_CONCURRENCY)
+    timeout = aiohttp.ClientTimeout(total=10)
     
-    if current_depth > max_depth or url in visited:
-        return []
+    # One pooled connector per crawl so pages on the same host share keep-alive
+    # connections; DNS answers are cached for the whole crawl
+    connector = aiohttp.TCPConnector(limit=CRAWL_CONCURRENCY, limit_per_host=CRAWL_CONCURRENCY, ttl_dns_cache=300)
+    
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        for depth in range(max_depth + 1):
+            urls.extend(frontier)
+            
+            # Pages at the last level are only collected, not followed
+            if depth == max_depth or not frontier:
+                break
+            
+            results = await asyncio.gather(
+                *[_fetch_links(session, semaphore, page_url, base_url, base_netloc) for page_url in frontier]
+            )
+            
+            frontier = []
+            for links in results:
+                for href in links:
+                    if href not in visited:
+                        visited.add(href)
+                        frontier.append(href)
+    
+    return urls
+
+async def _fetch_links(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    base_url: str,
+    base_netloc: str
+) -> Set[str]:
+    """
+    Fetch a page and return the distinct same-domain links on it
+    """
+    async with semaphore:
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    return set()
+                html = await response.read()
+        except Exception as e:
+            print(f"Error crawling {url}: {e}")
+            return set()
     
-    visited.append(url)
-    urls = [url]
+    # Parse the raw bytes in C; the parser detects the encoding itself
+    tree = HTMLParser(html)
     
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            return urls
+    links = set()
+    for link in tree.css('a[href]'):
+        href = link.attributes.get('href')
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Skip empty links, anchors, non-HTTP schemes, etc.
+        if not href or href.startswith(_SKIP_LINK_PREFIXES):
+            continue
         
-        if current_depth < max_depth:
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                
-                # Skip non-HTTP links, anchors, etc.
-                if href.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
-                    continue
-                
-                # Handle relative URLs
-                if not href.startswith(('http://', 'https://')):
-                    href = urljoin(base_url, href)
-                
-                # Stay on the same domain
-                if urlparse(href).netloc != urlparse(base_url).netloc:
-                    continue
-                
-                # Crawl linked page
-                if href not in visited:
-                    urls.extend(crawl_website(href, base_url, max_depth, current_depth + 1, visited))
-    
-    except Exception as e:
-        print(f"Error crawling {url}: {e}")
+        # Handle relative URLs
+        if not href.startswith(('http://', 'https://')):
+            href = urljoin(base_url, href)
+        
+        # Stay on the same domain
+        if urlparse(href).netloc != base_netloc:
+            continue
+        
+        links.add(href)
     
-    return urls
-
+    return links
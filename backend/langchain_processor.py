@@ -1,13 +1,193 @@
 import os
-from typing import List, Dict, Any, Tuple, Optional
+import atexit
+import asyncio
+import shutil
+import threading
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator
 import json
-from langchain.vectorstores import Chroma
-from langchain.embeddings import OpenAIEmbeddings
+from functools import lru_cache
+from langchain.vectorstores.base import VectorStore
+from langchain.embeddings import OpenAIEmbeddings, HuggingFaceEmbeddings
+from langchain.embeddings.base import Embeddings
 from langchain.chat_models import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
+from langchain.schema import Document, BaseMessage, SystemMessage, HumanMessage, AIMessage
+from langchain.callbacks.base import AsyncCallbackHandler
+from vector_backends import open_vectorstore
+from caching import LRUCache, cache_key
 from langchain.prompts import PromptTemplate
 
+# Which embeddings to use: "openai" (API) or "local" (in-process sentence-transformers model)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+
+# Local embedding model settings
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+
+# Number of texts sent per embeddings request (OpenAI accepts up to 2048 inputs)
+EMBEDDING_BATCH_SIZE = 512
+
+# Number of query embeddings kept in memory, keyed by normalized query text
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+
+# Number of chat answers kept in memory per bot, keyed by the messages sent (which
+# include the retrieved context, so knowledge base changes produce new entries)
+ANSWER_CACHE_SIZE = 1024
+
+class _CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches query embeddings, so repeated questions skip the model call
+    """
+    
+    def __init__(self, embeddings: Embeddings):
+        self._embeddings = embeddings
+        self._cache = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embeddings.embed_documents(texts)
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._embeddings.aembed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        key = cache_key(text)
+        vector = self._cache.get(key)
+        if vector is None:
+            vector = self._embeddings.embed_query(text)
+            self._cache.put(key, vector)
+        return vector
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        key = cache_key(text)
+        vector = self._cache.get(key)
+        if vector is None:
+            vector = await self._embeddings.aembed_query(text)
+            self._cache.put(key, vector)
+        return vector
+
+@lru_cache(maxsize=None)
+def _get_embeddings() -> Embeddings:
+    """
+    Shared embeddings client; the local model is loaded once and reused across all bots
+    """
+    if EMBEDDING_BACKEND == "local":
+        embeddings = HuggingFaceEmbeddings(
+            model_name=LOCAL_EMBEDDING_MODEL,
+            model_kwargs={"device": LOCAL_EMBEDDING_DEVICE},
+            encode_kwargs={"batch_size": 64, "normalize_embeddings": True}
+        )
+    else:
+        embeddings = OpenAIEmbeddings(chunk_size=EMBEDDING_BATCH_SIZE, max_retries=6)
+    return _CachedQueryEmbeddings(embeddings)
+
+# Open vector store handles, by bot ID. Every reader and writer goes through
+# _get_vectorstore so they all share one handle per bot.
+VECTORSTORE_CACHE_SIZE = 128
+_vectorstores = LRUCache(VECTORSTORE_CACHE_SIZE)
+_vectorstores_lock = threading.Lock()
+
+def _get_vectorstore(bot_id: str) -> VectorStore:
+    """
+    Open a bot's vector store once and reuse the handle across calls
+    """
+    with _vectorstores_lock:
+        vectorstore = _vectorstores.get(bot_id)
+        if vectorstore is None:
+            # A handle evicted with unpersisted writes must be reused; reopening
+            # from disk would drop those writes
+            with _dirty_lock:
+                vectorstore = _dirty.get(bot_id)
+            if vectorstore is None:
+                vectorstore = open_vectorstore(_get_embeddings(), f"knowledge_bases/{bot_id}")
+            _vectorstores.put(bot_id, vectorstore)
+        return vectorstore
+
+# Vector stores are persisted this many seconds after their first unpersisted write,
+# so bursts of writes during ingestion share one persist
+PERSIST_DELAY = 5.0
+
+# Vector stores with writes that haven't been persisted yet, by bot ID
+_dirty: Dict[str, VectorStore] = {}
+_dirty_lock = threading.Lock()
+_persist_timer: Optional[threading.Timer] = None
+
+# Held by a flush from its snapshot of _dirty until it has persisted, and by
+# delete_for_bot, so a flush can't write a deleted bot's store back to disk
+_persist_lock = threading.Lock()
+
+def _mark_dirty(bot_id: str, vectorstore: VectorStore):
+    """
+    Schedule a vector store to be persisted by the next flush
+    """
+    global _persist_timer
+    
+    with _dirty_lock:
+        _dirty[bot_id] = vectorstore
+        if _persist_timer is None:
+            _persist_timer = threading.Timer(PERSIST_DELAY, KnowledgeBaseProcessor.flush)
+            _persist_timer.daemon = True
+            _persist_timer.start()
+
+def _reset_persist_state():
+    """
+    Forked workers start with no pending writes or timer; those belong to the parent
+    """
+    global _dirty_lock, _persist_timer, _persist_lock
+    
+    _dirty.clear()
+    _dirty_lock = threading.Lock()
+    _persist_timer = None
+    _persist_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_persist_state)
+
+# Maximum number of embeddings requests in flight at once
+EMBEDDING_CONCURRENCY = 8
+
+async def _aembed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts in EMBEDDING_BATCH_SIZE batches, sending the batches concurrently
+    """
+    embeddings = _get_embeddings()
+    semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+    
+    async def embed_batch(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+    
+    batches = [texts[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+    results = await asyncio.gather(*[embed_batch(batch) for batch in batches])
+    return [vector for batch in results for vector in batch]
+
+# System message for answering from retrieved context; the question follows as the user message
+QA_PROMPT = PromptTemplate(
+    template="""
+    {system_prompt}
+    
+    Context information is below.
+    ---------------------
+    {context}
+    ---------------------
+    
+    Given the context information and not prior knowledge, answer the question.
+    If you don't know the answer, just say that you don't know. Don't try to make up an answer.
+    """,
+    input_variables=["context", "system_prompt"]
+)
+
+# Reply used when a bot has no knowledge base to answer from
+NO_KNOWLEDGE_RESPONSE = "I don't have any knowledge to answer that question. Please add some documents to my knowledge base."
+
+class _TokenQueueHandler(AsyncCallbackHandler):
+    """
+    Collects tokens from a streaming LLM into a queue
+    """
+    
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+    
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        await self.queue.put(token)
+
 class KnowledgeBaseProcessor:
     """
     Handles the creation and management of knowledge bases for bots
@@ -23,45 +203,84 @@ class KnowledgeBaseProcessor:
         os.makedirs(kb_dir, exist_ok=True)
         
         # Initialize empty vector store
-        embeddings = OpenAIEmbeddings()
-        Chroma(embedding_function=embeddings, persist_directory=kb_dir)
+        _get_vectorstore(bot_id)
+    
+    @staticmethod
+    def delete_for_bot(bot_id: str):
+        """
+        Delete a bot's knowledge base
+        """
+        with _persist_lock:
+            # Nothing left to persist for this bot
+            with _dirty_lock:
+                _dirty.pop(bot_id, None)
+            
+            # Drop this bot's cached store handle and chat processor (with its cached answers)
+            _vectorstores.pop(bot_id)
+            _chat_processors.pop(bot_id)
+            
+            kb_dir = f"knowledge_bases/{bot_id}"
+            if os.path.exists(kb_dir):
+                shutil.rmtree(kb_dir)
     
     @staticmethod
     def add_documents(bot_id: str, source_id: str, documents: List[Any]):
         """
         Add documents to a bot's knowledge base
         """
-        kb_dir = f"knowledge_bases/{bot_id}"
-        
-        # Load existing vector store
-        embeddings = OpenAIEmbeddings()
-        vectorstore = Chroma(embedding_function=embeddings, persist_directory=kb_dir)
+        vectorstore = _get_vectorstore(bot_id)
         
         # Add metadata to documents
         for doc in documents:
             doc.metadata["source_id"] = source_id
         
-        # Add documents to vector store
-        vectorstore.add_documents(documents)
-        vectorstore.persist()
+        texts = [doc.page_content for doc in documents]
+        if not texts:
+            return
+        
+        # Embed, then add the precomputed vectors so the vector store doesn't embed them again.
+        # API batches are sent concurrently; the local model batches internally.
+        if EMBEDDING_BACKEND == "local":
+            vectors = _get_embeddings().embed_documents(texts)
+        else:
+            vectors = asyncio.run(_aembed_texts(texts))
+        vectorstore.add_embeddings(texts, vectors, [doc.metadata for doc in documents])
+        _mark_dirty(bot_id, vectorstore)
     
     @staticmethod
     def remove_source(bot_id: str, source_id: str):
         """
         Remove documents from a source from the knowledge base
         """
-        kb_dir = f"knowledge_bases/{bot_id}"
-        
-        # Load existing vector store
-        embeddings = OpenAIEmbeddings()
-        vectorstore = Chroma(embedding_function=embeddings, persist_directory=kb_dir)
+        vectorstore = _get_vectorstore(bot_id)
         
         # Delete documents with matching source_id
-        vectorstore.delete(where={"source_id": source_id})
-        vectorstore.persist()
+        vectorstore.delete_by_source(source_id)
+        _mark_dirty(bot_id, vectorstore)
+    
+    @staticmethod
+    def flush():
+        """
+        Persist every vector store with pending writes
+        """
+        global _persist_timer
+        
+        with _persist_lock:
+            with _dirty_lock:
+                pending = list(_dirty.items())
+                _dirty.clear()
+                if _persist_timer is not None:
+                    _persist_timer.cancel()
+                    _persist_timer = None
+            
+            for bot_id, vectorstore in pending:
+                try:
+                    vectorstore.persist()
+                except Exception as e:
+                    print(f"Error persisting knowledge base for bot {bot_id}: {e}")
     
     @staticmethod
-    def get_vectorstore(bot_id: str) -> Optional[Chroma]:
+    def get_vectorstore(bot_id: str) -> Optional[VectorStore]:
         """
         Get the vector store for a bot
         """
@@ -70,9 +289,10 @@ class KnowledgeBaseProcessor:
         if not os.path.exists(kb_dir):
             return None
         
-        # Load existing vector store
-        embeddings = OpenAIEmbeddings()
-        return Chroma(embedding_function=embeddings, persist_directory=kb_dir)
+        return _get_vectorstore(bot_id)
+
+# Don't lose batched writes on shutdown
+atexit.register(KnowledgeBaseProcessor.flush)
 
 class ChatProcessor:
     """
@@ -81,7 +301,27 @@ class ChatProcessor:
     
     def __init__(self, bot_id: str):
         self.bot_id = bot_id
-        self.vectorstore = KnowledgeBaseProcessor.get_vectorstore(bot_id)
+        
+        # Build the clients once; per-message state (history, system prompt) is passed in on each call.
+        # Retrieval runs on the raw message and the answer is a single LLM call, with no
+        # extra LLM round trip to condense the question against the history.
+        self._llm = ChatOpenAI(temperature=0.2, cache=False)
+        self._streaming_llm = ChatOpenAI(temperature=0.2, streaming=True, cache=False)
+        
+        # Answers to non-streamed messages; dropped with the processor when the bot is deleted
+        self._answer_cache = LRUCache(ANSWER_CACHE_SIZE)
+    
+    def _get_retriever(self):
+        """
+        Retriever over the bot's current vector store handle, or None if it has no knowledge base
+        
+        The store is looked up on every call rather than held, so chat always reads
+        the same handle that ingestion writes to.
+        """
+        vectorstore = KnowledgeBaseProcessor.get_vectorstore(self.bot_id)
+        if vectorstore is None:
+            return None
+        return vectorstore.as_retriever(search_kwargs={"k": 5})
     
     def process_message(
         self, 
@@ -100,79 +340,131 @@ class ChatProcessor:
         Returns:
             A tuple of (response_text, sources)
         """
-        if not self.vectorstore:
-            return "I don't have any knowledge to answer that question. Please add some documents to my knowledge base.", []
+        retriever = self._get_retriever()
+        if not retriever:
+            return NO_KNOWLEDGE_RESPONSE, []
         
-        # Convert conversation history to the format expected by LangChain
-        langchain_history = []
-        for msg in conversation_history:
-            if msg.get("sender") == "user":
-                langchain_history.append((msg.get("content", ""), ""))
-            elif msg.get("sender") == "bot":
-                if langchain_history:
-                    langchain_history[-1] = (langchain_history[-1][0], msg.get("content", ""))
-                else:
-                    langchain_history.append(("", msg.get("content", "")))
-        
-        # Create memory
-        memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
+        # Process message
+        docs = retriever.get_relevant_documents(message)
+        answer = self._predict(self._build_messages(message, conversation_history, system_prompt, docs))
         
-        # Add conversation history to memory
-        for human, ai in langchain_history:
-            if human:
-                memory.chat_memory.add_user_message(human)
-            if ai:
-                memory.chat_memory.add_ai_message(ai)
+        # Extract sources, one entry per distinct source
+        sources = []
+        seen_sources = set()
+        for doc in docs:
+            source = doc.metadata.get("source")
+            if source and source not in seen_sources:
+                seen_sources.add(source)
+                sources.append({
+                    "text": doc.page_content[:100] + "...",
+                    "source": source
+                })
         
-        # Create retriever
-        retriever = self.vectorstore.as_retriever(
-            search_kwargs={"k": 5}
-        )
+        return answer, sources
+    
+    async def astream_message(
+        self,
+        message: str,
+        conversation_history: List[Dict[str, Any]],
+        system_prompt: str
+    ) -> AsyncIterator[str]:
+        """
+        Process a message using the bot's knowledge base, yielding the answer as it is generated
         
-        # Create custom prompt
-        custom_prompt = PromptTemplate(
-            template="""
-            {system_prompt}
-            
-            Context information is below.
-            ---------------------
-            {context}
-            ---------------------
-            
-            Given the context information and not prior knowledge, answer the question.
-            If you don't know the answer, just say that you don't know. Don't try to make up an answer.
+        Args:
+            message: The user message
+            conversation_history: Previous messages in the conversation
+            system_prompt: The system prompt for the bot
             
-            Question: {question}
-            """,
-            input_variables=["context", "question", "system_prompt"]
-        )
+        Yields:
+            Chunks of the response text
+        """
+        retriever = self._get_retriever()
+        if not retriever:
+            yield NO_KNOWLEDGE_RESPONSE
+            return
         
-        # Create chain
-        llm = ChatOpenAI(temperature=0.2)
-        qa_chain = ConversationalRetrievalChain.from_llm(
-            llm=llm,
-            retriever=retriever,
-            memory=memory,
-            return_source_documents=True,
-            combine_docs_chain_kwargs={"prompt": custom_prompt}
-        )
+        # The vector store search is blocking, so keep it off the event loop
+        docs = await asyncio.to_thread(retriever.get_relevant_documents, message)
         
-        # Process message
-        result = qa_chain({"question": message, "system_prompt": system_prompt})
+        handler = _TokenQueueHandler()
+        task = asyncio.create_task(self._streaming_llm.apredict_messages(
+            self._build_messages(message, conversation_history, system_prompt, docs),
+            callbacks=[handler]
+        ))
+        # Signal the end of the stream however the call finishes
+        task.add_done_callback(lambda _: handler.queue.put_nowait(None))
         
-        # Extract sources
-        sources = []
-        for doc in result.get("source_documents", []):
-            if doc.metadata and "source" in doc.metadata:
-                source = {
-                    "text": doc.page_content[:100] + "...",
-                    "source": doc.metadata["source"]
-                }
-                if source not in sources:
-                    sources.append(source)
+        try:
+            while True:
+                token = await handler.queue.get()
+                if token is None:
+                    break
+                yield token
+        finally:
+            # Stop the LLM call if the consumer went away (e.g. the client disconnected)
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
         
-        return result["answer"], sources
+        # Surface any error raised by the LLM call
+        await task
+    
+    def _predict(self, messages: List[BaseMessage]) -> str:
+        """
+        Answer the messages, serving repeats from the bot's answer cache
+        """
+        key = cache_key(*(f"{msg.type}:{msg.content}" for msg in messages))
+        answer = self._answer_cache.get(key)
+        if answer is None:
+            answer = self._llm.predict_messages(messages).content
+            self._answer_cache.put(key, answer)
+        return answer
+    
+    @classmethod
+    def _build_messages(
+        cls,
+        message: str,
+        conversation_history: List[Dict[str, Any]],
+        system_prompt: str,
+        docs: List[Document]
+    ) -> List[BaseMessage]:
+        """
+        Assemble the chat messages for answering from retrieved documents
+        """
+        context = "\n\n".join(doc.page_content for doc in docs)
+        return [
+            SystemMessage(content=QA_PROMPT.format(system_prompt=system_prompt, context=context)),
+            *cls._to_chat_history(conversation_history),
+            HumanMessage(content=message)
+        ]
+    
+    @staticmethod
+    def _to_chat_history(conversation_history: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Convert conversation history to the format expected by LangChain
+        """
+        chat_history = []
+        for msg in conversation_history:
+            content = msg.get("content", "")
+            if not content:
+                continue
+            if msg.get("sender") == "user":
+                chat_history.append(HumanMessage(content=content))
+            elif msg.get("sender") == "bot":
+                chat_history.append(AIMessage(content=content))
+        return chat_history
 
+# Chat processors, by bot ID
+_chat_processors = LRUCache(128)
+
+def get_chat_processor(bot_id: str) -> ChatProcessor:
+    """
+    Get a bot's chat processor, reusing its LLM clients across messages
+    """
+    chat_processor = _chat_processors.get(bot_id)
+    if chat_processor is None:
+        chat_processor = ChatProcessor(bot_id)
+        _chat_processors.put(bot_id, chat_processor)
+    return chat_processor
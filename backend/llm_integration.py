@@ -1,7 +1,45 @@
 import os
 import json
+import asyncio
+import threading
+import weakref
 from typing import Dict, List, Any, Optional
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from caching import LRUCache, cache_key
+
+# Shared HTTP session so provider calls reuse keep-alive connections instead of
+# paying a new TCP+TLS handshake per request
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False
+    )
+))
+
+# Responses to repeated prompts are served from memory. Sampling above this
+# temperature is meant to vary, so those responses are never cached.
+RESPONSE_CACHE_SIZE = 4096
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.3
+_response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+# Live integrations, so their HTTP sessions can be closed on shutdown
+_integrations: "weakref.WeakSet[LLMIntegration]" = weakref.WeakSet()
+
+async def aclose_all():
+    """
+    Close the async HTTP sessions of every live LLMIntegration
+    """
+    for integration in list(_integrations):
+        await integration.aclose()
 
 class LLMIntegration:
     """
@@ -32,6 +70,12 @@ class LLMIntegration:
         
         if not self.api_key:
             raise ValueError(f"API key for {provider} not provided and not found in environment variables")
+        
+        # HTTP sessions for async OpenAI calls, one per event loop since an aiohttp
+        # session can only be used from the loop it was created in
+        self._aiosessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+        self._aiosessions_lock = threading.Lock()
+        _integrations.add(self)
     
     def generate_response(
         self, 
@@ -56,8 +100,13 @@ class LLMIntegration:
         Returns:
             The generated text response
         """
+        key = self._response_cache_key(prompt, system_prompt, conversation_history, model, temperature, max_tokens)
+        response = _response_cache.get(key) if key else None
+        if response is not None:
+            return response
+        
         if self.provider == "openai":
-            return self._generate_openai_response(
+            response = self._generate_openai_response(
                 prompt, 
                 system_prompt, 
                 conversation_history, 
@@ -66,7 +115,7 @@ class LLMIntegration:
                 max_tokens
             )
         elif self.provider == "anthropic":
-            return self._generate_anthropic_response(
+            response = self._generate_anthropic_response(
                 prompt, 
                 system_prompt, 
                 conversation_history, 
@@ -76,23 +125,134 @@ class LLMIntegration:
             )
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
+        
+        self._cache_response(key, response)
+        return response
     
-    def _generate_openai_response(
+    async def agenerate_response(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[List[Dict[str, Any]]] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> str:
+        """
+        Generate a response from the LLM without blocking the event loop
+        
+        Takes the same arguments as generate_response.
+        
+        Returns:
+            The generated text response
+        """
+        key = self._response_cache_key(prompt, system_prompt, conversation_history, model, temperature, max_tokens)
+        response = _response_cache.get(key) if key else None
+        if response is not None:
+            return response
+        
+        if self.provider == "openai":
+            response = await self._agenerate_openai_response(
+                prompt, 
+                system_prompt, 
+                conversation_history, 
+                model or "gpt-3.5-turbo", 
+                temperature, 
+                max_tokens
+            )
+        elif self.provider == "anthropic":
+            response = await asyncio.to_thread(
+                self._generate_anthropic_response,
+                prompt, 
+                system_prompt, 
+                conversation_history, 
+                model or "claude-2", 
+                temperature, 
+                max_tokens
+            )
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+        
+        self._cache_response(key, response)
+        return response
+    
+    def _response_cache_key(
         self, 
         prompt: str, 
         system_prompt: Optional[str], 
         conversation_history: Optional[List[Dict[str, Any]]],
-        model: str,
+        model: Optional[str],
         temperature: float,
         max_tokens: int
-    ) -> str:
+    ) -> Optional[str]:
         """
-        Generate a response using OpenAI's API
+        Cache key for a request, or None if its response shouldn't be cached
         """
-        import openai
+        if temperature > RESPONSE_CACHE_MAX_TEMPERATURE:
+            return None
         
-        openai.api_key = self.api_key
+        return cache_key(
+            self.provider,
+            model or "",
+            str(temperature),
+            str(max_tokens),
+            system_prompt or "",
+            json.dumps(conversation_history or [], sort_keys=True, default=str),
+            prompt
+        )
+    
+    @staticmethod
+    def _cache_response(key: Optional[str], response: str):
+        """
+        Cache a response, unless it is an error message
+        """
+        if key and not response.startswith("Error generating response"):
+            _response_cache.put(key, response)
+    
+    async def aclose(self):
+        """
+        Close the HTTP sessions used for async calls, each on its own event loop.
+        Called on app shutdown via aclose_all().
+        """
+        with self._aiosessions_lock:
+            sessions = list(self._aiosessions.items())
+            self._aiosessions.clear()
         
+        current_loop = asyncio.get_running_loop()
+        for loop, session in sessions:
+            if session.closed:
+                continue
+            try:
+                if loop is current_loop:
+                    await session.close()
+                elif loop.is_running():
+                    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+                # A session whose loop has stopped can no longer be closed cleanly;
+                # its connections are released when it is garbage-collected
+            except Exception as e:
+                print(f"Error closing HTTP session: {e}")
+    
+    def _get_aiosession(self) -> aiohttp.ClientSession:
+        """
+        Get the HTTP session for the running event loop, creating it on first use
+        """
+        loop = asyncio.get_running_loop()
+        with self._aiosessions_lock:
+            session = self._aiosessions.get(loop)
+            if session is None or session.closed:
+                session = aiohttp.ClientSession()
+                self._aiosessions[loop] = session
+            return session
+    
+    @staticmethod
+    def _openai_messages(
+        prompt: str, 
+        system_prompt: Optional[str], 
+        conversation_history: Optional[List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the chat messages for an OpenAI request
+        """
         messages = []
         
         # Add system prompt if provided
@@ -106,10 +266,59 @@ class LLMIntegration:
         # Add the current prompt
         messages.append({"role": "user", "content": prompt})
         
+        return messages
+    
+    def _generate_openai_response(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str], 
+        conversation_history: Optional[List[Dict[str, Any]]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """
+        Generate a response using OpenAI's API
+        """
+        import openai
+        
+        # The key is passed per request rather than set on the shared openai module.
+        # The SDK keeps one pooled HTTP session per thread.
         try:
             response = openai.ChatCompletion.create(
+                api_key=self.api_key,
+                model=model,
+                messages=self._openai_messages(prompt, system_prompt, conversation_history),
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Error generating OpenAI response: {e}")
+            return f"Error generating response: {str(e)}"
+    
+    async def _agenerate_openai_response(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str], 
+        conversation_history: Optional[List[Dict[str, Any]]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """
+        Generate a response using OpenAI's API asynchronously
+        """
+        import openai
+        
+        # Without a session set, the SDK opens a new aiohttp session (and connections) per call
+        token = openai.aiosession.set(self._get_aiosession())
+        try:
+            response = await openai.ChatCompletion.acreate(
+                api_key=self.api_key,
                 model=model,
-                messages=messages,
+                messages=self._openai_messages(prompt, system_prompt, conversation_history),
                 temperature=temperature,
                 max_tokens=max_tokens
             )
@@ -118,6 +327,8 @@ class LLMIntegration:
         except Exception as e:
             print(f"Error generating OpenAI response: {e}")
             return f"Error generating response: {str(e)}"
+        finally:
+            openai.aiosession.reset(token)
     
     def _generate_anthropic_response(
         self, 
@@ -165,7 +376,7 @@ class LLMIntegration:
         }
         
         try:
-            response = requests.post(
+            response = _SESSION.post(
                 "https://api.anthropic.com/v1/complete",
                 headers=headers,
                 json=data
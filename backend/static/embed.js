@@ -0,0 +1,290 @@
+(function() {
+    window.PyBotBuilder = {
+        init: function(config) {
+            const botId = config.botId;
+            const mode = config.mode || 'inline';
+            const theme = config.theme || {};
+            const botName = config.botName || 'AI Assistant';
+
+            if (mode === 'inline') {
+                const container = document.getElementById(config.containerId);
+                if (!container) {
+                    console.error('PyBotBuilder: Container element not found');
+                    return;
+                }
+
+                this.createChatInterface(container, botId, theme, botName);
+            } else if (mode === 'popup') {
+                this.createPopupWidget(botId, theme, botName);
+            }
+        },
+
+        createChatInterface: function(container, botId, theme, botName) {
+            // Create chat interface HTML
+            container.innerHTML = `
+                <div class="pybot-chat" style="
+                    font-family: ${theme.fontFamily || 'sans-serif'};
+                    border-radius: ${theme.borderRadius || '8px'};
+                    overflow: hidden;
+                    border: 1px solid #e2e8f0;
+                    height: 500px;
+                    display: flex;
+                    flex-direction: column;
+                ">
+                    <div class="pybot-header" style="
+                        background-color: ${theme.headerColor || '#f8fafc'};
+                        color: ${theme.textColor || '#000000'};
+                        padding: 12px;
+                        border-bottom: 1px solid #e2e8f0;
+                        display: flex;
+                        align-items: center;
+                    ">
+                        <div class="pybot-avatar" style="
+                            width: 32px;
+                            height: 32px;
+                            border-radius: 50%;
+                            background-color: #cbd5e1;
+                            margin-right: 8px;
+                        "></div>
+                        <div>
+                            <div style="font-weight: 500;">${botName}</div>
+                            <div style="font-size: 12px; opacity: 0.7;">Online</div>
+                        </div>
+                    </div>
+                    <div class="pybot-messages" style="
+                        flex: 1;
+                        overflow-y: auto;
+                        padding: 16px;
+                        background-color: ${theme.backgroundColor || '#ffffff'};
+                        color: ${theme.textColor || '#000000'};
+                    ">
+                        <div class="pybot-message bot" style="
+                            display: flex;
+                            margin-bottom: 16px;
+                        ">
+                            <div style="
+                                background-color: #f1f5f9;
+                                padding: 12px;
+                                border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
+                                max-width: 80%;
+                            ">
+                                <div style="font-size: 14px;">Hello! How can I help you today?</div>
+                                <div style="font-size: 12px; opacity: 0.7; margin-top: 4px;">${new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })}</div>
+                            </div>
+                        </div>
+                    </div>
+                    <div class="pybot-input" style="
+                        padding: 12px;
+                        border-top: 1px solid #e2e8f0;
+                        background-color: ${theme.backgroundColor || '#ffffff'};
+                    ">
+                        <form class="pybot-form" style="
+                            display: flex;
+                            gap: 8px;
+                        ">
+                            <input type="text" class="pybot-input-field" placeholder="Type a message..." style="
+                                flex: 1;
+                                padding: 8px 12px;
+                                border: 1px solid #e2e8f0;
+                                border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
+                                font-size: 14px;
+                            ">
+                            <button type="submit" class="pybot-send-button" style="
+                                background-color: ${theme.primaryColor || '#0ea5e9'};
+                                color: white;
+                                border: none;
+                                border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
+                                width: 36px;
+                                height: 36px;
+                                display: flex;
+                                align-items: center;
+                                justify-content: center;
+                                cursor: pointer;
+                            ">
+                                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                                    <line x1="22" y1="2" x2="11" y2="13"></line>
+                                    <polygon points="22 2 15 22 11 13 2 9 22 2"></polygon>
+                                </svg>
+                            </button>
+                        </form>
+                    </div>
+                </div>
+            `;
+
+            // Add event listeners
+            const form = container.querySelector('.pybot-form');
+            const input = container.querySelector('.pybot-input-field');
+            const messagesContainer = container.querySelector('.pybot-messages');
+
+            form.addEventListener('submit', function(e) {
+                e.preventDefault();
+                const message = input.value.trim();
+                if (!message) return;
+
+                // Add user message
+                this.addMessage(messagesContainer, message, 'user', theme);
+                input.value = '';
+
+                // Simulate bot response
+                this.simulateBotResponse(messagesContainer, message, botId, theme);
+            }.bind(this));
+        },
+
+        createPopupWidget: function(botId, theme, botName) {
+            // Create button element
+            const button = document.createElement('div');
+            button.className = 'pybot-widget-button';
+            button.style.cssText = `
+                position: fixed;
+                bottom: 20px;
+                right: 20px;
+                width: 56px;
+                height: 56px;
+                border-radius: 50%;
+                background-color: ${theme.primaryColor || '#0ea5e9'};
+                color: white;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                cursor: pointer;
+                box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
+                z-index: 9999;
+            `;
+
+            button.innerHTML = `
+                <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                    <path d="M21 15a2 2 0 0 1-2 2H7l-4 4V5a2 2 0 0 1 2-2h14a2 2 0 0 1 2 2z"></path>
+                </svg>
+            `;
+
+            // Create chat container
+            const chatContainer = document.createElement('div');
+            chatContainer.className = 'pybot-popup-container';
+            chatContainer.style.cssText = `
+                position: fixed;
+                bottom: 90px;
+                right: 20px;
+                width: 350px;
+                height: 500px;
+                border-radius: ${theme.borderRadius || '8px'};
+                overflow: hidden;
+                box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
+                z-index: 9999;
+                display: none;
+            `;
+
+            document.body.appendChild(button);
+            document.body.appendChild(chatContainer);
+
+            // Toggle chat on button click
+            button.addEventListener('click', function() {
+                if (chatContainer.style.display === 'none') {
+                    chatContainer.style.display = 'block';
+                    if (!chatContainer.hasChildNodes()) {
+                        this.createChatInterface(chatContainer, botId, theme, botName);
+                    }
+                } else {
+                    chatContainer.style.display = 'none';
+                }
+            }.bind(this));
+        },
+
+        addMessage: function(container, text, sender, theme) {
+            const messageDiv = document.createElement('div');
+            messageDiv.className = `pybot-message ${sender}`;
+            messageDiv.style.cssText = `
+                display: flex;
+                margin-bottom: 16px;
+                ${sender === 'user' ? 'justify-content: flex-end;' : ''}
+            `;
+
+            const messageContent = document.createElement('div');
+            messageContent.style.cssText = `
+                ${sender === 'user' 
+                    ? `background-color: ${theme.primaryColor || '#0ea5e9'}; color: white;` 
+                    : 'background-color: #f1f5f9; color: #1e293b;'}
+                padding: 12px;
+                border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
+                max-width: 80%;
+            `;
+
+            const messageText = document.createElement('div');
+            messageText.style.cssText = 'font-size: 14px;';
+            messageText.textContent = text;
+
+            const messageTime = document.createElement('div');
+            messageTime.style.cssText = 'font-size: 12px; opacity: 0.7; margin-top: 4px;';
+            messageTime.textContent = new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+
+            messageContent.appendChild(messageText);
+            messageContent.appendChild(messageTime);
+            messageDiv.appendChild(messageContent);
+            container.appendChild(messageDiv);
+
+            // Scroll to bottom
+            container.scrollTop = container.scrollHeight;
+        },
+
+        simulateBotResponse: function(container, message, botId, theme) {
+            // Add typing indicator
+            const typingDiv = document.createElement('div');
+            typingDiv.className = 'pybot-message bot typing';
+            typingDiv.style.cssText = 'display: flex; margin-bottom: 16px;';
+
+            const typingContent = document.createElement('div');
+            typingContent.style.cssText = `
+                background-color: #f1f5f9;
+                padding: 12px;
+                border-radius: ${theme.borderRadius ? `calc(${theme.borderRadius} - 2px)` : '6px'};
+                max-width: 80%;
+                display: flex;
+                align-items: center;
+            `;
+
+            typingContent.innerHTML = `
+                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" class="pybot-typing-icon" style="margin-right: 8px; animation: pybot-spin 1s linear infinite;">
+                    <path d="M21 12a9 9 0 1 1-6.219-8.56"></path>
+                </svg>
+                <span style="font-size: 14px; color: #64748b;">Thinking...</span>
+            `;
+
+            typingDiv.appendChild(typingContent);
+            container.appendChild(typingDiv);
+
+            // Scroll to bottom
+            container.scrollTop = container.scrollHeight;
+
+            // In a real implementation, this would call your API
+            setTimeout(() => {
+                // Remove typing indicator
+                container.removeChild(typingDiv);
+
+                // Add bot response
+                let response = "I understand you're asking about that. In a real implementation, I would use the knowledge base to provide a relevant answer.";
+
+                // Simple response logic based on keywords
+                if (message.toLowerCase().includes('hello') || message.toLowerCase().includes('hi')) {
+                    response = "Hello! How can I assist you today?";
+                } else if (message.toLowerCase().includes('help')) {
+                    response = "I'm here to help! You can ask me questions about our products, services, or anything else you need assistance with.";
+                } else if (message.toLowerCase().includes('thank')) {
+                    response = "You're welcome! Is there anything else I can help you with?";
+                } else if (message.toLowerCase().includes('bye')) {
+                    response = "Goodbye! Have a great day!";
+                }
+
+                this.addMessage(container, response, 'bot', theme);
+            }, 1500);
+        }
+    };
+
+    // Add styles
+    const style = document.createElement('style');
+    style.textContent = `
+        @keyframes pybot-spin {
+            from { transform: rotate(0deg); }
+            to { transform: rotate(360deg); }
+        }
+    `;
+    document.head.appendChild(style);
+})();
@@ -0,0 +1,319 @@
+import os
+import uuid
+import pickle
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from langchain.vectorstores import Chroma
+from langchain.vectorstores.base import VectorStore
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+
+# Which vector store bots use: "chroma" or "faiss"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+
+# FAISS indexes switch from exact search to int8 HNSW above this many vectors,
+# and to IVF-PQ above the second threshold
+FAISS_HNSW_THRESHOLD = 100_000
+FAISS_IVFPQ_THRESHOLD = 500_000
+
+# IVF-PQ parameters: inverted lists, lists probed per query, max sub-quantizers
+FAISS_IVF_NLIST = 1024
+FAISS_IVF_NPROBE = 16
+FAISS_PQ_MAX_M = 48
+
+# Quantized indexes are trained on at most this many vectors
+FAISS_TRAIN_SAMPLE = 65_536
+
+class ChromaBackend(Chroma):
+    """
+    Chroma vector store with the methods KnowledgeBaseProcessor relies on
+    """
+    
+    def add_embeddings(self, texts: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]]):
+        """
+        Add texts with precomputed embeddings
+        """
+        self._collection.upsert(
+            ids=[str(uuid.uuid4()) for _ in texts],
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=metadatas
+        )
+    
+    def delete_by_source(self, source_id: str):
+        """
+        Delete all texts added for a knowledge source
+        """
+        self._collection.delete(where={"source_id": source_id})
+
+class FAISSBackend(VectorStore):
+    """
+    Vector store backed by an in-memory FAISS index, persisted to disk
+    
+    Vectors are L2-normalized so inner product equals cosine similarity. Small
+    stores use exact search (IndexFlatIP); larger ones use HNSW over int8
+    scalar-quantized vectors, and the largest use IVF-PQ. The float32 vectors
+    are needed only to rebuild the index: persisted rows are read through a
+    memory map of an append-only file, and only rows added since the last
+    persist are held in RAM.
+    """
+    
+    INDEX_FILE = "index.faiss"
+    DATA_FILE = "store.pkl"
+    VECTORS_FILE = "vectors.f32"
+    
+    def __init__(self, embedding_function: Embeddings, persist_directory: str):
+        self._embedding_function = embedding_function
+        self._persist_directory = persist_directory
+        self._lock = threading.Lock()
+        
+        # Parallel arrays: row i of the index is texts[i] / metadatas[i] / vectors[i],
+        # where the vectors are _vectors (persisted, memory-mapped) followed by _pending
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._vectors = None
+        self._pending: List[Any] = []
+        self._index = None
+        
+        # Set when rows were removed, so the vectors file has to be rewritten
+        self._rewrite_vectors = False
+        
+        self._load()
+    
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding_function
+    
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        embeddings = self._embedding_function.embed_documents(texts)
+        self.add_embeddings(texts, embeddings, metadatas or [{} for _ in texts])
+        return [str(i) for i in range(len(self._texts) - len(texts), len(self._texts))]
+    
+    def add_embeddings(self, texts: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]]):
+        """
+        Add texts with precomputed embeddings
+        """
+        import numpy as np
+        
+        if not texts:
+            return
+        
+        vectors = self._normalize(np.asarray(embeddings, dtype="float32"))
+        
+        with self._lock:
+            self._texts.extend(texts)
+            self._metadatas.extend(metadatas)
+            self._pending.append(vectors)
+            
+            # Rebuild when crossing an index size threshold, otherwise add incrementally
+            if self._index is None or self._index_type() != self._index_type_for(len(self._texts)):
+                self._index = self._build_index(self._all_vectors())
+            else:
+                self._index.add(vectors)
+    
+    def delete_by_source(self, source_id: str):
+        """
+        Delete all texts added for a knowledge source
+        """
+        with self._lock:
+            keep = [i for i, metadata in enumerate(self._metadatas) if metadata.get("source_id") != source_id]
+            if len(keep) == len(self._texts):
+                return
+            
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._vectors = self._all_vectors()[keep] if keep else None
+            self._pending = []
+            self._rewrite_vectors = True
+            
+            # HNSW and PQ don't support removal, so rebuild from the remaining vectors
+            self._index = self._build_index(self._vectors) if keep else None
+    
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+    
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        import numpy as np
+        
+        if self._index is None:
+            return []
+        
+        query_vector = self._normalize(np.asarray([self._embedding_function.embed_query(query)], dtype="float32"))
+        
+        with self._lock:
+            scores, ids = self._index.search(query_vector, min(k, len(self._texts)))
+            return [
+                (Document(page_content=self._texts[i], metadata=self._metadatas[i]), float(score))
+                for score, i in zip(scores[0], ids[0])
+                if i != -1
+            ]
+    
+    def persist(self):
+        """
+        Write the index and its texts/metadata to the persist directory
+        """
+        import faiss
+        
+        os.makedirs(self._persist_directory, exist_ok=True)
+        index_path = os.path.join(self._persist_directory, self.INDEX_FILE)
+        vectors_path = os.path.join(self._persist_directory, self.VECTORS_FILE)
+        
+        with self._lock:
+            if self._index is None:
+                for path in (index_path, vectors_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            else:
+                faiss.write_index(self._index, index_path)
+                
+                if self._rewrite_vectors or not os.path.exists(vectors_path):
+                    # Write beside and swap in, since the old file may still be memory-mapped
+                    tmp_path = vectors_path + ".tmp"
+                    with open(tmp_path, "wb") as f:
+                        for vectors in (self._vectors, *self._pending):
+                            if vectors is not None:
+                                vectors.tofile(f)
+                    os.replace(tmp_path, vectors_path)
+                else:
+                    # Only the new rows are written
+                    with open(vectors_path, "ab") as f:
+                        for vectors in self._pending:
+                            vectors.tofile(f)
+                
+                # Release the in-memory rows in favour of the file
+                self._pending = []
+                self._rewrite_vectors = False
+                self._vectors = self._map_vectors(vectors_path, self._index.d)
+            
+            with open(os.path.join(self._persist_directory, self.DATA_FILE), "wb") as f:
+                pickle.dump((self._texts, self._metadatas), f)
+    
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        persist_directory: str = "",
+        **kwargs: Any
+    ) -> "FAISSBackend":
+        store = cls(embedding_function=embedding, persist_directory=persist_directory)
+        store.add_texts(texts, metadatas)
+        return store
+    
+    def _load(self):
+        """
+        Load a previously persisted index, if any
+        """
+        data_path = os.path.join(self._persist_directory, self.DATA_FILE)
+        if not os.path.exists(data_path):
+            return
+        
+        import faiss
+        
+        with open(data_path, "rb") as f:
+            self._texts, self._metadatas = pickle.load(f)
+        
+        index_path = os.path.join(self._persist_directory, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        
+        self._index = faiss.read_index(index_path)
+        if isinstance(self._index, faiss.IndexIVF):
+            self._index.nprobe = FAISS_IVF_NPROBE
+        
+        vectors_path = os.path.join(self._persist_directory, self.VECTORS_FILE)
+        if os.path.exists(vectors_path):
+            self._vectors = self._map_vectors(vectors_path, self._index.d)
+    
+    def _all_vectors(self):
+        """
+        All rows, persisted then pending. Only copies when there are pending rows.
+        """
+        import numpy as np
+        
+        parts = [vectors for vectors in (self._vectors, *self._pending) if vectors is not None]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+    
+    @staticmethod
+    def _map_vectors(path: str, d: int):
+        """
+        Memory-map a vectors file as an (n, d) float32 array
+        """
+        import numpy as np
+        
+        return np.memmap(path, dtype="float32", mode="r").reshape(-1, d)
+    
+    def _build_index(self, vectors):
+        """
+        Build an index suited to the number of vectors
+        """
+        import faiss
+        
+        import numpy as np
+        
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        n, d = vectors.shape
+        index_type = self._index_type_for(n)
+        
+        if index_type == "ivfpq":
+            quantizer = faiss.IndexFlatIP(d)
+            index = faiss.IndexIVFPQ(quantizer, d, FAISS_IVF_NLIST, self._pq_subquantizers(d), 8, faiss.METRIC_INNER_PRODUCT)
+            index.nprobe = FAISS_IVF_NPROBE
+        elif index_type == "hnsw":
+            index = faiss.IndexHNSWSQ(d, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(d)
+        
+        # Quantizers learn their codebooks from a random sample before the first add
+        if not index.is_trained:
+            if n > FAISS_TRAIN_SAMPLE:
+                sample = vectors[np.random.default_rng(0).choice(n, FAISS_TRAIN_SAMPLE, replace=False)]
+            else:
+                sample = vectors
+            index.train(sample)
+        
+        index.add(vectors)
+        return index
+    
+    def _index_type(self) -> str:
+        import faiss
+        
+        if isinstance(self._index, faiss.IndexIVF):
+            return "ivfpq"
+        return "hnsw" if isinstance(self._index, faiss.IndexHNSW) else "flat"
+    
+    @staticmethod
+    def _index_type_for(n_vectors: int) -> str:
+        if n_vectors >= FAISS_IVFPQ_THRESHOLD:
+            return "ivfpq"
+        return "hnsw" if n_vectors >= FAISS_HNSW_THRESHOLD else "flat"
+    
+    @staticmethod
+    def _pq_subquantizers(d: int) -> int:
+        """
+        Largest number of PQ sub-quantizers (up to FAISS_PQ_MAX_M) that divides d
+        """
+        return next(m for m in range(min(FAISS_PQ_MAX_M, d), 0, -1) if d % m == 0)
+    
+    @staticmethod
+    def _normalize(vectors):
+        import numpy as np
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+def open_vectorstore(embedding_function: Embeddings, persist_directory: str) -> VectorStore:
+    """
+    Open the configured vector store backend for a persist directory
+    """
+    if VECTOR_BACKEND == "faiss":
+        return FAISSBackend(embedding_function=embedding_function, persist_directory=persist_directory)
+    return ChromaBackend(embedding_function=embedding_function, persist_directory=persist_directory)
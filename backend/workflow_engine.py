@@ -1,8 +1,13 @@
 from typing import Dict, List, Any, Optional, Callable
 import json
 import re
+from collections import defaultdict
 from llm_integration import LLMIntegration
 
+# {variable} placeholders in message labels and AI system prompts; any key without
+# braces is allowed (e.g. {user.name}, {first-name})
+_PLACEHOLDER_RE = re.compile(r"\{([^{}]+)\}")
+
 class WorkflowEngine:
     """
     Engine to process user messages through a bot's workflow
@@ -20,6 +25,16 @@ class WorkflowEngine:
         self.edges = workflow_data.get("edges", [])
         self.llm_integration = llm_integration
         
+        # Outgoing edges per node, and per condition node a map of condition -> target
+        self.out_edges: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.cond_edges: Dict[str, Dict[Any, str]] = defaultdict(dict)
+        for edge in self.edges:
+            source = edge.get("source")
+            self.out_edges[source].append(edge)
+            
+            edge_condition = edge.get("data", {}).get("condition")
+            self.cond_edges[source].setdefault(edge_condition, edge.get("target"))
+        
         # Find the start node
         self.start_node_id = None
         for node_id, node in self.nodes.items():
@@ -30,6 +45,79 @@ class WorkflowEngine:
         if not self.start_node_id and self.nodes:
             # If no start node is explicitly defined, use the first node
             self.start_node_id = list(self.nodes.keys())[0]
+        
+        self._compile_conditions()
+        
+        # Placeholders used by each message/AI node template
+        self._placeholders: Dict[str, frozenset] = {
+            node_id: frozenset(_PLACEHOLDER_RE.findall(self._template_for(node)))
+            for node_id, node in self.nodes.items()
+            if node.get("type") in ("message", "ai")
+        }
+    
+    @staticmethod
+    def _template_for(node: Dict[str, Any]) -> str:
+        """
+        Get the template text of a message or AI node
+        """
+        node_data = node.get("data", {})
+        if node.get("type") == "ai":
+            return node_data.get("systemPrompt", "You are a helpful assistant.")
+        return node_data.get("label", "")
+    
+    def _render(self, node: Dict[str, Any], context: Dict[str, Any]) -> str:
+        """
+        Substitute context variables into a node's template in a single pass
+        """
+        template = self._template_for(node)
+        placeholders = self._placeholders.get(node["id"], frozenset())
+        if not placeholders:
+            return template
+        
+        # Placeholders name context keys by their string form
+        values = {str(key): value for key, value in context.items()}
+        if placeholders.isdisjoint(values):
+            return template
+        
+        # Unknown placeholders and other braces are left as-is
+        return _PLACEHOLDER_RE.sub(
+            lambda match: str(values[match.group(1)]) if match.group(1) in values else match.group(0),
+            template
+        )
+    
+    def _compile_conditions(self):
+        """
+        Precompute lowercased keywords and compiled patterns for condition nodes
+        so they aren't rebuilt for every message
+        """
+        self._keywords: Dict[str, frozenset] = {}
+        self._patterns: Dict[str, Optional[re.Pattern]] = {}
+        self._intents: Dict[str, List[tuple]] = {}
+        
+        for node_id, node in self.nodes.items():
+            if node.get("type") != "condition":
+                continue
+            
+            node_data = node.get("data", {})
+            condition_type = node_data.get("conditionType", "keyword")
+            
+            if condition_type == "keyword":
+                self._keywords[node_id] = frozenset(keyword.lower() for keyword in node_data.get("keywords", []))
+                
+            elif condition_type == "regex":
+                pattern = node_data.get("pattern", "")
+                try:
+                    self._patterns[node_id] = re.compile(pattern, re.IGNORECASE) if pattern else None
+                except re.error as e:
+                    print(f"Invalid pattern in condition node {node_id}: {e}")
+                    self._patterns[node_id] = None
+                    
+            elif condition_type == "intent":
+                # Intents keep their order, since the first matching intent wins
+                self._intents[node_id] = [
+                    (intent_name, frozenset(keyword.lower() for keyword in keywords))
+                    for intent_name, keywords in node_data.get("intents", {}).items()
+                ]
     
     def process_message(
         self, 
@@ -88,18 +176,9 @@ class WorkflowEngine:
                 # Condition node - evaluate the condition and determine the next node
                 condition_result = self._evaluate_condition(current_node, message, context)
                 
-                # Find the edge that matches the condition result
-                next_node_id = None
-                for edge in self.edges:
-                    if edge.get("source") == current_node_id:
-                        # Check if this edge has a condition that matches
-                        edge_condition = edge.get("data", {}).get("condition")
-                        
-                        if edge_condition == condition_result or edge_condition == "default":
-                            next_node_id = edge.get("target")
-                            break
-                
-                current_node_id = next_node_id
+                # Follow the edge that matches the condition result, else the default edge
+                cond_edges = self.cond_edges.get(current_node_id, {})
+                current_node_id = cond_edges.get(condition_result) or cond_edges.get("default")
                 continue
                 
             elif node_type == "ai":
@@ -107,13 +186,8 @@ class WorkflowEngine:
                 response = self._process_ai_node(current_node, message, conversation_history, context)
             
             # Find the next node (if any)
-            next_node_id = None
-            for edge in self.edges:
-                if edge.get("source") == current_node_id:
-                    next_node_id = edge.get("target")
-                    break
-            
-            current_node_id = next_node_id
+            out_edges = self.out_edges.get(current_node_id)
+            current_node_id = out_edges[0].get("target") if out_edges else None
         
         # If we didn't set a response, provide a default
         if response is None:
@@ -135,13 +209,7 @@ class WorkflowEngine:
         Returns:
             The processed message text
         """
-        message_template = node.get("data", {}).get("label", "")
-        
-        # Replace variables in the template
-        for key, value in context.items():
-            message_template = message_template.replace(f"{{{key}}}", str(value))
-        
-        return message_template
+        return self._render(node, context)
     
     def _process_ai_node(
         self, 
@@ -167,11 +235,9 @@ class WorkflowEngine:
         
         # Get node configuration
         node_data = node.get("data", {})
-        system_prompt = node_data.get("systemPrompt", "You are a helpful assistant.")
         
         # Replace variables in the system prompt
-        for key, value in context.items():
-            system_prompt = system_prompt.replace(f"{{{key}}}", str(value))
+        system_prompt = self._render(node, context)
         
         # Generate the response
         try:
@@ -199,32 +265,30 @@ class WorkflowEngine:
         Returns:
             The condition result (e.g., "true", "false", or a custom value)
         """
+        node_id = node["id"]
         node_data = node.get("data", {})
         condition_type = node_data.get("conditionType", "keyword")
+        message_lower = message.lower()
         
         if condition_type == "keyword":
             # Check for keywords in the message
-            keywords = node_data.get("keywords", [])
-            for keyword in keywords:
-                if keyword.lower() in message.lower():
-                    return "true"
+            if any(keyword in message_lower for keyword in self._keywords.get(node_id, ())):
+                return "true"
             return "false"
             
         elif condition_type == "regex":
             # Check for regex pattern match
-            pattern = node_data.get("pattern", "")
-            if pattern and re.search(pattern, message, re.IGNORECASE):
+            pattern = self._patterns.get(node_id)
+            if pattern and pattern.search(message):
                 return "true"
             return "false"
             
         elif condition_type == "intent":
             # This would typically use an NLU service to detect intent
             # For simplicity, we'll just check for keywords
-            intents = node_data.get("intents", {})
-            for intent_name, keywords in intents.items():
-                for keyword in keywords:
-                    if keyword.lower() in message.lower():
-                        return intent_name
+            for intent_name, keywords in self._intents.get(node_id, ()):
+                if any(keyword in message_lower for keyword in keywords):
+                    return intent_name
             return "default"
             
         elif condition_type == "variable":